@@ -1,7 +1,9 @@
 # kinethos_cdk/kinethos_cdk/constructs/telegram_webhook.py
 from __future__ import annotations
-from typing import Dict, Optional
-from aws_cdk import Duration
+import os
+from typing import Dict, List, Optional
+import jsii
+from aws_cdk import Duration, BundlingOptions as AssetBundlingOptions
 from constructs import Construct
 
 from aws_cdk.aws_apigatewayv2 import (
@@ -10,10 +12,112 @@ from aws_cdk.aws_apigatewayv2 import (
 from aws_cdk.aws_apigatewayv2_integrations import HttpLambdaIntegration
 
 # NEW import:
-from aws_cdk.aws_lambda_python_alpha import PythonFunction
+from aws_cdk.aws_lambda_python_alpha import (
+    PythonFunction, PythonLayerVersion, BundlingOptions, ICommandHooks
+)
 from aws_cdk import aws_lambda as _lambda
 
+# Already provided by the Lambda Python runtime; never ship our own copy
+RUNTIME_PROVIDED_PACKAGES = ["boto3", "botocore", "s3transfer", "jmespath"]
+
+# Never copied into /asset-input (keeps the asset hash stable too)
+SOURCE_EXCLUDES = ["tests", "__pycache__", "*.pyc", ".env", "*.md"]
+
+# Extra deps (numpy) for the knowledge index, installed only when an index is bundled
+KNOWLEDGE_INDEX = os.path.join("knowledge", "index.npy")
+KNOWLEDGE_REQUIREMENTS = "requirements-knowledge.txt"
+
+
+def _slim_commands(
+    output_dir: str,
+    *,
+    runtime_root: str,
+    exclude_runtime_packages: bool,
+    strip: bool,
+    precompile: bool,
+) -> List[str]:
+    """Shell commands run inside the bundling container once deps are installed."""
+    cmds: List[str] = []
+    if exclude_runtime_packages:
+        for pkg in RUNTIME_PROVIDED_PACKAGES:
+            cmds.append(f"rm -rf {output_dir}/{pkg} {output_dir}/{pkg}-*.dist-info")
+    if strip:
+        cmds.append(
+            f"find {output_dir} -depth -type d "
+            r"\( -name tests -o -name test -o -name docs -o -name __pycache__ \) "
+            "-exec rm -rf {} +"
+        )
+        cmds.append(
+            f"find {output_dir} -type f "
+            r"\( -name '*.pyc' -o -name '*.pyo' -o -name '*.pyi' -o -name '*.md' -o -name '*.rst' \) "
+            "-delete"
+        )
+    if precompile:
+        # /var/task and /opt are read-only, so without this every cold start recompiles.
+        # unchecked-hash: the asset zip normalises mtimes, which would invalidate timestamp pycs.
+        cmds.append(
+            "python -m compileall -q -j 0 --invalidation-mode unchecked-hash "
+            f"-s {output_dir} -p {runtime_root} {output_dir}"
+        )
+    return cmds
+
+
+@jsii.implements(ICommandHooks)
+class _SlimBundlingHooks:
+    """Post-install hooks for PythonFunction / PythonLayerVersion bundling."""
+
+    def __init__(
+        self,
+        *,
+        runtime_root: str,
+        exclude_runtime_packages: bool,
+        strip: bool,
+        precompile: bool,
+        extra_requirements: Optional[str] = None,
+    ) -> None:
+        self._runtime_root = runtime_root
+        self._extra_requirements = extra_requirements
+        self._exclude_runtime_packages = exclude_runtime_packages
+        self._strip = strip
+        self._precompile = precompile
+
+    def before_bundling(self, input_dir: str, output_dir: str) -> List[str]:
+        return []
+
+    def after_bundling(self, input_dir: str, output_dir: str) -> List[str]:
+        cmds: List[str] = []
+        if self._extra_requirements:
+            cmds.append(f"python -m pip install -r {input_dir}/{self._extra_requirements} -t {output_dir}")
+        return cmds + _slim_commands(
+            output_dir,
+            runtime_root=self._runtime_root,
+            exclude_runtime_packages=self._exclude_runtime_packages,
+            strip=self._strip,
+            precompile=self._precompile,
+        )
+
+
 class TelegramWebhook(Construct):
+    """
+    Lambda (Python 3.11) + HTTP API route for the Telegram webhook.
+
+    Bundling options:
+      - exclude_runtime_packages: drop boto3/botocore/... (the runtime provides them)
+      - strip_bundle: remove tests, docs, stubs and stale __pycache__ from the bundle
+      - precompile: ship .pyc (unchecked-hash) so cold starts skip compilation
+      - dependencies_layer: install requirements.txt into a separate layer, so
+        handler-only changes don't rebuild/re-upload the dependencies
+
+    numpy (requirements-knowledge.txt) is only installed when the code path
+    ships a knowledge index (knowledge/index.npy, see scripts/build_knowledge_index.py).
+
+    Exposes:
+      - function (_lambda.Function)
+      - dependencies_layer (PythonLayerVersion | None)
+      - knowledge_enabled (bool)
+      - http_api (HttpApi)
+      - webhook_url (str)
+    """
     def __init__(
         self,
         scope: Construct,
@@ -25,21 +129,88 @@ class TelegramWebhook(Construct):
         timeout_seconds: int = 10,
         webhook_path: str = "/bot",
         enable_cors: bool = True,
+        exclude_runtime_packages: bool = True,
+        strip_bundle: bool = True,
+        precompile: bool = True,
+        dependencies_layer: bool = False,
     ) -> None:
         super().__init__(scope, construct_id)
 
-        # Bundles your code + deps from services/telegram_bot/requirements.txt inside a Docker build
-        fn = PythonFunction(
-            self,
-            "Handler",
-            entry=lambda_code_path,                 # directory with lambda_function.py + requirements.txt
-            index="lambda_function.py",            # filename
-            handler="lambda_handler",              # function name
-            runtime=_lambda.Runtime.PYTHON_3_11,
-            memory_size=memory_size,
-            timeout=Duration.seconds(timeout_seconds),
-            environment=env_vars or {},
-        )
+        runtime = _lambda.Runtime.PYTHON_3_11
+        self.dependencies_layer: Optional[PythonLayerVersion] = None
+        self.knowledge_enabled = os.path.isfile(os.path.join(lambda_code_path, KNOWLEDGE_INDEX))
+        extra_requirements = KNOWLEDGE_REQUIREMENTS if self.knowledge_enabled else None
+
+        if dependencies_layer:
+            # requirements.txt -> /opt/python, cached until the requirements change
+            self.dependencies_layer = PythonLayerVersion(
+                self,
+                "DependenciesLayer",
+                entry=lambda_code_path,
+                compatible_runtimes=[runtime],
+                bundling=BundlingOptions(
+                    asset_excludes=SOURCE_EXCLUDES + ["*.py", "knowledge"],
+                    command_hooks=_SlimBundlingHooks(
+                        runtime_root="/opt/python",
+                        exclude_runtime_packages=exclude_runtime_packages,
+                        strip=strip_bundle,
+                        precompile=precompile,
+                        extra_requirements=extra_requirements,
+                    ),
+                ),
+            )
+            # Function asset is the handler sources only (no pip install)
+            copy_sources = [
+                "cp -rT /asset-input /asset-output",
+                "rm -f /asset-output/requirements*.txt",
+            ] + _slim_commands(
+                "/asset-output",
+                runtime_root="/var/task",
+                exclude_runtime_packages=False,
+                strip=strip_bundle,
+                precompile=precompile,
+            )
+            fn = _lambda.Function(
+                self,
+                "Handler",
+                code=_lambda.Code.from_asset(
+                    lambda_code_path,
+                    exclude=SOURCE_EXCLUDES,
+                    bundling=AssetBundlingOptions(
+                        image=runtime.bundling_image,
+                        command=["bash", "-c", " && ".join(copy_sources)],
+                    ),
+                ),
+                handler="lambda_function.lambda_handler",
+                runtime=runtime,
+                layers=[self.dependencies_layer],
+                memory_size=memory_size,
+                timeout=Duration.seconds(timeout_seconds),
+                environment=env_vars or {},
+            )
+        else:
+            # Bundles your code + deps from services/telegram_bot/requirements.txt inside a Docker build
+            fn = PythonFunction(
+                self,
+                "Handler",
+                entry=lambda_code_path,                 # directory with lambda_function.py + requirements.txt
+                index="lambda_function.py",            # filename
+                handler="lambda_handler",              # function name
+                runtime=runtime,
+                memory_size=memory_size,
+                timeout=Duration.seconds(timeout_seconds),
+                environment=env_vars or {},
+                bundling=BundlingOptions(
+                    asset_excludes=SOURCE_EXCLUDES,
+                    command_hooks=_SlimBundlingHooks(
+                        runtime_root="/var/task",
+                        exclude_runtime_packages=exclude_runtime_packages,
+                        strip=strip_bundle,
+                        precompile=precompile,
+                        extra_requirements=extra_requirements,
+                    ),
+                ),
+            )
 
         integration = HttpLambdaIntegration("TelegramIntegration", fn)
         cors_opts = CorsPreflightOptions(allow_origins=["*"], allow_methods=[CorsHttpMethod.ANY]) if enable_cors else None
@@ -48,4 +219,4 @@ class TelegramWebhook(Construct):
 
         self.function = fn
         self.http_api = http_api
-        self.webhook_url = f"{http_api.api_endpoint}{webhook_path}"
\ No newline at end of file
+        self.webhook_url = f"{http_api.api_endpoint}{webhook_path}"
@@ -8,8 +8,9 @@ from constructs import Construct
 class UpdatesTable(Construct):
     """
     Creates a DynamoDB table for operational queries:
-      - PK: pk (e.g., CHAT#{chat_id})
-      - SK: sk (e.g., TS#{epoch_ms})
+      - PK: pk (CHAT#{chat_id}, USER#{user_id}, or sharded TYPE#{update_type}#{n})
+      - SK: sk (TS#{epoch_ms}#{update_id}, or UPD#{update_id} for undated updates;
+        see services/telegram_bot/update_keys.py)
       - TTL: expire_at (epoch seconds)
       - GSI1 for idempotency lookup by update_id if you want (optional)
     """
@@ -3,10 +3,19 @@ import os
 import base64
 import asyncio
 import logging
+import random
 import time
-from typing import Optional, Tuple
+from typing import Optional
 import boto3
 
+# Optional fast JSON backend: add `orjson` to requirements.txt to enable it
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover - stdlib fallback
+    _json_loads = json.loads
+
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, KeyboardButton
 from telegram.ext import (
     Application,
@@ -17,6 +26,9 @@ from telegram.ext import (
     filters,
 )
 
+from retrieval import Passage, format_passages, format_sources, retrieve
+from update_keys import UpdateHeader, extract_header, partition_key, sort_key
+
 # --- Bedrock config via env vars ---
 BEDROCK_MODEL_ID = os.getenv(
     "BEDROCK_MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0"
@@ -42,6 +54,22 @@ _dynamodb = boto3.client("dynamodb")
 FIREHOSE_STREAM = os.getenv("FIREHOSE_STREAM_NAME")
 DDB_TABLE = os.getenv("DDB_TABLE_NAME")
 
+
+def _sample_rate(raw: Optional[str]) -> float:
+    """Parse a 0..1 sampling rate from the env; bad values mean 0 rather than a broken import."""
+    try:
+        rate = float(raw or 0)
+    except ValueError:
+        logger.warning("Invalid PAYLOAD_LOG_SAMPLE_RATE %r; payload logging disabled", raw)
+        return 0.0
+    if rate != rate:  # NaN
+        return 0.0
+    return min(max(rate, 0.0), 1.0)
+
+
+# Fraction of update payloads written to the logs (0 = never, 1 = always)
+PAYLOAD_LOG_SAMPLE_RATE = _sample_rate(os.getenv("PAYLOAD_LOG_SAMPLE_RATE"))
+
 # ---------- Onboarding conversation states ----------
 (
     GOAL,
@@ -80,16 +108,25 @@ def _kb(options: list[list[str]]) -> ReplyKeyboardMarkup:
 
 
 # ---------- Bedrock handler ----------
-def call_bedrock_anthropic(prompt: str) -> str:
+def call_bedrock_anthropic(prompt: str, passages: Optional[list[Passage]] = None) -> str:
     """
     Calls Anthropic Claude on Bedrock using the Messages API style request.
     Adjust if you choose a different provider (Cohere, Llama, etc.).
+    `passages` (from the knowledge index) are added to the system prompt as
+    numbered references the model is asked to cite.
     """
+    system = BEDROCK_SYSTEM_PROMPT
+    if passages:
+        system += (
+            "\n\nGround your answer in the reference passages below and cite them "
+            "inline as [n]. If they don't cover the question, say so rather than guessing."
+            "\n\n<references>\n" + format_passages(passages) + "\n</references>"
+        )
     body = {
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": BEDROCK_MAX_TOKENS,
         "temperature": BEDROCK_TEMPERATURE,
-        "system": BEDROCK_SYSTEM_PROMPT,
+        "system": system,
         "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
     }
 
@@ -231,9 +268,17 @@ async def ai_coach(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await chat.send_message("🤖 Running your prompt through Bedrock…")
 
     try:
-        answer = call_bedrock_anthropic(args_text)
+        passages = retrieve(brt, args_text)
+    except Exception:
+        logging.exception("Knowledge retrieval failed; answering ungrounded")
+        passages = []
+
+    try:
+        answer = call_bedrock_anthropic(args_text, passages)
         if not answer:
             answer = "_(Model returned no text)_"
+        elif passages:
+            answer += "\n\n" + format_sources(passages)
         await _send_chunked(chat, answer)
     except Exception:
         logging.exception("Bedrock call failed")
@@ -292,48 +337,39 @@ async def _ensure_initialized() -> Application:
 
 
 # ---------- Helpers ----------
-def _extract_ids(update_json: dict) -> Tuple[Optional[int], int]:
-    """Return (chat_id, epoch_ms) for the update."""
-    now_ms = int(time.time() * 1000)
-    chat_id = None
-    # Common cases
-    msg = update_json.get("message") or update_json.get("edited_message")
-    if msg and "chat" in msg and "id" in msg["chat"]:
-        chat_id = msg["chat"]["id"]
-        # Telegram 'date' field is seconds; convert to ms if present
-        if "date" in msg:
-            try:
-                now_ms = int(msg["date"]) * 1000
-            except Exception:
-                pass
-    # Fallbacks (callback_query, etc.)
-    if chat_id is None:
-        cq = update_json.get("callback_query")
-        if cq and "message" in cq and "chat" in cq["message"]:
-            chat_id = cq["message"]["chat"].get("id")
-    return chat_id, now_ms
-
-
-def _put_firehose(update_json: dict):
-    """Put the update into Firehose."""
+def _read_body(event: dict) -> bytes:
+    """Return the raw request body as bytes (decoded from base64 if needed)."""
+    body = event.get("body") or b""
+    if event.get("isBase64Encoded"):
+        return base64.b64decode(body)
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    return bytes(body)
+
+
+def _put_firehose(raw: bytes):
+    """Put the raw update bytes into Firehose (newline-delimited JSON)."""
     logger.info("Putting update into Firehose")
     if not FIREHOSE_STREAM:
         return
-    data = (json.dumps(update_json, separators=(",", ":")) + "\n").encode("utf-8")
-    _firehose.put_record(DeliveryStreamName=FIREHOSE_STREAM, Record={"Data": data})
+    raw = raw.strip()
+    if b"\n" in raw:
+        # Pretty-printed body would break NDJSON; Telegram sends compact JSON
+        raw = json.dumps(_json_loads(raw), separators=(",", ":")).encode("utf-8")
+    _firehose.put_record(DeliveryStreamName=FIREHOSE_STREAM, Record={"Data": raw + b"\n"})
 
 
-def _put_dynamo(update_json: dict):
-    """Put the update into DynamoDB."""
+def _put_dynamo(header: UpdateHeader, payload: str):
+    """Put the update into DynamoDB; `payload` is the original JSON body."""
     logger.info("Putting update into DynamoDB")
     if not DDB_TABLE:
         return
-    chat_id, ts_ms = _extract_ids(update_json)
-    pk = f"CHAT#{chat_id}" if chat_id is not None else "CHAT#unknown"
-    sk = f"TS#{ts_ms}"
-    update_id = update_json.get("update_id")
+    pk = partition_key(header)
+    sk = sort_key(header)
+    update_id = header.update_id
+    now = time.time()
     # TTL in 90 days
-    expire_at = int(time.time()) + 90 * 24 * 3600
+    expire_at = int(now) + 90 * 24 * 3600
 
     item = {
         "pk": {"S": pk},
@@ -341,7 +377,9 @@ def _put_dynamo(update_json: dict):
         "update_id": {"N": str(update_id)}
         if isinstance(update_id, int)
         else {"S": str(update_id)},
-        "payload": {"S": json.dumps(update_json, separators=(",", ":"))},
+        "update_type": {"S": header.update_type},
+        "payload": {"S": payload},
+        "received_at": {"N": str(int(now * 1000))},
         "expire_at": {"N": str(expire_at)},
     }
     # Optional GSI for idempotency lookup
@@ -370,26 +408,28 @@ def lambda_handler(event, context):
             logger.warning("Secret token mismatch")
             return {"statusCode": 401, "body": "unauthorized"}
 
-    # 2) Decode body safely
-    body = event.get("body", "")
-    if event.get("isBase64Encoded"):
-        body = base64.b64decode(body)
-    if isinstance(body, (bytes, bytearray)):
-        body = body.decode("utf-8")
-
+    # 2) Decode body once; the raw bytes are reused as-is by the archive sinks
     try:
-        update_json = json.loads(body)
+        raw = _read_body(event)
+        payload = raw.decode("utf-8")
+        update_json = _json_loads(payload)
+        if not isinstance(update_json, dict):
+            raise ValueError("update is not a JSON object")
     except Exception as e:
         logger.exception("Failed to parse request body as JSON: %s", e)
         return {"statusCode": 400, "body": "invalid body"}
 
+    header = extract_header(update_json)
+    if PAYLOAD_LOG_SAMPLE_RATE and random.random() < PAYLOAD_LOG_SAMPLE_RATE:
+        logger.info(payload)
+
     # 3) Dual-write BEFORE bot logic (so we capture even if bot handler fails)
     try:
-        _put_firehose(update_json)
+        _put_firehose(raw)
     except Exception:
         logger.exception("Firehose put_record failed")
     try:
-        _put_dynamo(update_json)
+        _put_dynamo(header, payload)
     except Exception:
         logger.exception("DynamoDB put_item failed")
 
@@ -399,7 +439,7 @@ def lambda_handler(event, context):
         app = loop.run_until_complete(_ensure_initialized())
         update = Update.de_json(update_json, app.bot)
         loop.run_until_complete(app.process_update(update))
-        logger.info(body)
+        logger.info("Processed update %s", header.update_id)
     except Exception:
         logger.exception("Error while processing Telegram update")
         # Return 200 so Telegram doesn't keep retrying *forever* while you debug,
@@ -0,0 +1,141 @@
+"""
+Grounding passages for /ai_coach from the embedded knowledge index.
+
+The index is built offline by scripts/build_knowledge_index.py into
+knowledge/ next to this file:
+  - index.npy   float16 matrix (n_chunks x dims), rows L2-normalised
+  - meta.json   {"model": ..., "dims": ..., "chunks": [{"source", "title", "text"}, ...]}
+
+The matrix is memory-mapped on first use (numpy is imported lazily too), so
+neither adds to cold start. A query is one embedding call, then a scan of the
+mapped rows in blocks of BLOCK_ROWS: each block is upcast to float32 for BLAS
+and scored, so extra memory stays bounded (BLOCK_ROWS x dims x 4 bytes) however
+large the corpus grows. The scan touches every page of index.npy; warm
+invocations serve those from the OS page cache. An argpartition picks the top-k.
+"""
+import json
+import logging
+import os
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger()
+
+KNOWLEDGE_DIR = os.getenv(
+    "KNOWLEDGE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge")
+)
+INDEX_FILE = "index.npy"
+META_FILE = "meta.json"
+
+KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "4"))
+KNOWLEDGE_MIN_SCORE = float(os.getenv("KNOWLEDGE_MIN_SCORE", "0.3"))
+
+
+class Passage(NamedTuple):
+    source: str
+    title: str
+    text: str
+    score: float
+
+
+class KnowledgeIndex:
+    """Memory-mapped embedding matrix + chunk metadata, loaded once per warm Lambda."""
+
+    # 2048 x 1024 dims -> 8 MB float32 scratch per block
+    BLOCK_ROWS = 2048
+
+    def __init__(self, directory: str) -> None:
+        import numpy as np
+
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.model_id: str = meta["model"]
+        self.dims: int = int(meta["dims"])
+        self.chunks: list[dict] = meta["chunks"]
+        self.matrix = np.load(os.path.join(directory, INDEX_FILE), mmap_mode="r")
+        if self.matrix.shape != (len(self.chunks), self.dims):
+            raise ValueError(
+                f"index shape {self.matrix.shape} does not match metadata "
+                f"({len(self.chunks)} chunks x {self.dims} dims)"
+            )
+
+    def search(self, query_vec, k: int = KNOWLEDGE_TOP_K, min_score: float = KNOWLEDGE_MIN_SCORE) -> list[Passage]:
+        """Top-k passages by cosine similarity (rows and query are unit vectors)."""
+        import numpy as np
+
+        n = self.matrix.shape[0]
+        if n == 0 or k <= 0:
+            return []
+        q = np.asarray(query_vec, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)  # never mutate the caller's array
+        # Upcast one block of float16 rows at a time so the product runs on float32 BLAS
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, self.BLOCK_ROWS):
+            block = self.matrix[start:start + self.BLOCK_ROWS]
+            np.matmul(block.astype(np.float32), q, out=scores[start:start + len(block)])
+        k = min(k, n)
+        top = np.argpartition(scores, n - k)[n - k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [
+            Passage(
+                self.chunks[i].get("source", ""),
+                self.chunks[i].get("title", ""),
+                self.chunks[i]["text"],
+                float(scores[i]),
+            )
+            for i in top
+            if scores[i] >= min_score
+        ]
+
+
+_index: Optional[KnowledgeIndex] = None
+_index_loaded: bool = False
+
+
+def get_index() -> Optional[KnowledgeIndex]:
+    """Load (once) the shipped index; None if no index is bundled."""
+    global _index, _index_loaded
+    if not _index_loaded:
+        _index_loaded = True
+        if os.path.exists(os.path.join(KNOWLEDGE_DIR, INDEX_FILE)):
+            try:
+                _index = KnowledgeIndex(KNOWLEDGE_DIR)
+                logger.info("Knowledge index mapped: %d chunks", len(_index.chunks))
+            except Exception:
+                logger.exception("Failed to load knowledge index; answering ungrounded")
+        else:
+            logger.info("No knowledge index at %s; answering ungrounded", KNOWLEDGE_DIR)
+    return _index
+
+
+def embed_text(brt, model_id: str, text: str, dims: int) -> list[float]:
+    """Titan text embeddings v2 via Bedrock; also used by the offline build."""
+    resp = brt.invoke_model(
+        modelId=model_id,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps({"inputText": text, "dimensions": dims, "normalize": True}),
+    )
+    return json.loads(resp["body"].read())["embedding"]
+
+
+def retrieve(brt, query: str, k: int = KNOWLEDGE_TOP_K) -> list[Passage]:
+    """Embed the query and return the top-k passages ([] when no index is shipped)."""
+    index = get_index()
+    if index is None:
+        return []
+    return index.search(embed_text(brt, index.model_id, query, index.dims), k)
+
+
+def format_passages(passages: list[Passage]) -> str:
+    """Numbered reference block for the system prompt; [n] matches the citations."""
+    return "\n\n".join(
+        f"[{n}] {p.title or p.source}\n{p.text}" for n, p in enumerate(passages, 1)
+    )
+
+
+def format_sources(passages: list[Passage]) -> str:
+    """Sources footer appended to the reply."""
+    return "Sources:\n" + "\n".join(
+        f"[{n}] {p.title or p.source}" + (f" ({p.source})" if p.title and p.source else "")
+        for n, p in enumerate(passages, 1)
+    )
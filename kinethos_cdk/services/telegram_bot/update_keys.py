@@ -0,0 +1,219 @@
+"""
+DynamoDB key scheme for raw Telegram updates.
+
+  - pk: CHAT#{chat_id}            updates that belong to a chat
+        USER#{user_id}            user-scoped updates without a chat (inline queries, ...)
+        TYPE#{update_type}#{n}    everything else (e.g. polls), sharded by update_id
+  - sk: TS#{epoch_ms:013d}#{update_id:012d}   dated updates, ordered by Telegram's date
+        UPD#{update_id:012d}                  updates without a date (inline queries,
+                                              polls, ...), ordered by update_id
+
+Both forms derive only from the update itself, so a Telegram redelivery of the
+same update overwrites its item instead of adding a second one (arrival time
+would not be stable across retries; the handler records it in received_at).
+
+Undated updates therefore cannot be range-queried by time: they are only
+ordered and queried by update_id (`query_updates(..., undated=True)`). That is
+every poll (so TYPE#poll holds only UPD# items) and most of what lands in
+USER# partitions (inline_query, chosen_inline_result, shipping_query,
+pre_checkout_query, poll_answer, purchased_paid_media). Filter on the
+received_at attribute when arrival time matters.
+
+Synthetic TYPE# partitions would otherwise take every such update on a single
+key, so they are spread over SYNTHETIC_SHARDS suffixes; `query_updates` fans
+out across the shards and merges them back in sort-key order.
+"""
+import heapq
+import itertools
+import os
+import time
+from typing import Iterator, NamedTuple, Optional
+
+SYNTHETIC_SHARDS = int(os.getenv("DDB_SYNTHETIC_SHARDS", "8"))
+
+# Update fields that carry the chat directly
+CHAT_TYPES = (
+    "message",
+    "edited_message",
+    "channel_post",
+    "edited_channel_post",
+    "business_message",
+    "edited_business_message",
+    "deleted_business_messages",
+    "message_reaction",
+    "message_reaction_count",
+    "my_chat_member",
+    "chat_member",
+    "chat_join_request",
+    "chat_boost",
+    "removed_chat_boost",
+)
+# Update fields scoped to a user (no chat); poll_answer may carry voter_chat instead
+USER_TYPES = (
+    "inline_query",
+    "chosen_inline_result",
+    "shipping_query",
+    "pre_checkout_query",
+    "purchased_paid_media",
+    "poll_answer",
+    "business_connection",
+)
+# callback_query: chat of the attached message, else the user; poll: neither
+UPDATE_TYPES = CHAT_TYPES + USER_TYPES + ("callback_query", "poll")
+
+
+class UpdateHeader(NamedTuple):
+    update_id: Optional[int]
+    update_type: str
+    chat_id: Optional[int]
+    user_id: Optional[int]
+    epoch_ms: Optional[int]  # None when the update carries no date
+
+
+def _dict(value) -> dict:
+    """Nested Telegram objects, or {} when a field is missing or malformed."""
+    return value if isinstance(value, dict) else {}
+
+
+def _date_ms(obj: dict) -> Optional[int]:
+    """Telegram dates are epoch seconds; boosts keep theirs on the nested boost."""
+    date = obj.get("date")
+    if date is None:
+        date = _dict(obj.get("boost")).get("add_date") or obj.get("remove_date")
+    try:
+        return int(date) * 1000 if date is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _update_type(update_json: dict) -> str:
+    """Known Update field if present, else the first object-valued field (newer Bot API types)."""
+    for key in UPDATE_TYPES:
+        if isinstance(update_json.get(key), dict):
+            return key
+    return next(
+        (k for k, v in update_json.items() if k != "update_id" and isinstance(v, dict)),
+        "unknown",
+    )
+
+
+def extract_header(update_json: dict) -> UpdateHeader:
+    """
+    Read only the envelope fields needed for keys (update_id, type, chat/user, date).
+    Touches the update-type object and its chat, never walks the full payload.
+    Never raises: malformed or missing fields just leave the value as None.
+    """
+    update_type = _update_type(update_json)
+    obj = _dict(update_json.get(update_type))
+    chat_id = user_id = None
+
+    if update_type == "callback_query":
+        msg = _dict(obj.get("message"))
+        chat_id = _dict(msg.get("chat")).get("id")
+        date_ms = _date_ms(msg) or None  # inaccessible messages have date 0
+    elif update_type == "poll":
+        date_ms = None
+    else:
+        # CHAT_TYPES, poll_answer from an anonymous chat admin (voter_chat), and
+        # unrecognised types that happen to carry a chat
+        chat_id = _dict(obj.get("chat") or obj.get("voter_chat")).get("id")
+        date_ms = _date_ms(obj)
+
+    if chat_id is None and update_type != "poll":
+        user_id = _dict(obj.get("from") or obj.get("user")).get("id")
+    return UpdateHeader(update_json.get("update_id"), update_type, chat_id, user_id, date_ms)
+
+
+def shard_pks(base_pk: str, shards: int = SYNTHETIC_SHARDS) -> list[str]:
+    """All physical partition keys behind a (possibly sharded) base key."""
+    if not base_pk.startswith("TYPE#"):
+        return [base_pk]
+    return [f"{base_pk}#{n}" for n in range(shards)]
+
+
+def partition_key(header: UpdateHeader, shards: int = SYNTHETIC_SHARDS) -> str:
+    if header.chat_id is not None:
+        return f"CHAT#{header.chat_id}"
+    if header.user_id is not None:
+        return f"USER#{header.user_id}"
+    # Deterministic shard (with the sort key) so Telegram retries overwrite the same item
+    update_id = header.update_id if isinstance(header.update_id, int) else 0
+    shard = update_id % shards
+    return f"TYPE#{header.update_type}#{shard}"
+
+
+def sort_key(header: UpdateHeader) -> str:
+    update_id = header.update_id
+    if not isinstance(update_id, int):
+        # Telegram always sends update_id; without it there is nothing stable to dedupe on
+        update_id = time.time_ns() % 10**12
+    if header.epoch_ms is None:
+        return f"UPD#{update_id:012d}"
+    return f"TS#{header.epoch_ms:013d}#{update_id:012d}"
+
+
+def _query_partition(
+    client,
+    table_name: str,
+    pk: str,
+    lo: str,
+    hi: str,
+    *,
+    newest_first: bool,
+    page_size: Optional[int],
+) -> Iterator[dict]:
+    """Lazily page through one partition in sort-key order."""
+    kwargs = {
+        "TableName": table_name,
+        "KeyConditionExpression": "pk = :pk AND sk BETWEEN :lo AND :hi",
+        "ExpressionAttributeValues": {
+            ":pk": {"S": pk},
+            ":lo": {"S": lo},
+            ":hi": {"S": hi},
+        },
+        "ScanIndexForward": not newest_first,
+    }
+    if page_size:
+        kwargs["Limit"] = page_size
+    while True:
+        resp = client.query(**kwargs)
+        yield from resp.get("Items", [])
+        if "LastEvaluatedKey" not in resp:
+            return
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def query_updates(
+    client,
+    table_name: str,
+    base_pk: str,
+    *,
+    start_ms: int = 0,
+    end_ms: Optional[int] = None,
+    limit: Optional[int] = None,
+    newest_first: bool = False,
+    undated: bool = False,
+    shards: int = SYNTHETIC_SHARDS,
+) -> list[dict]:
+    """
+    Query raw updates for a partition, fanning out across shards and merging in
+    sk order. By default returns dated (TS#) items between start_ms and end_ms,
+    e.g. query_updates(client, table, "CHAT#123", start_ms=...).
+    With `undated=True` the UPD# items (no Telegram date) are returned instead,
+    in update_id order; start_ms/end_ms don't apply to them. Polls and most
+    USER# updates are undated, e.g. query_updates(client, table, "TYPE#poll", undated=True).
+    `client` is a boto3 DynamoDB client; items are returned in low-level format.
+    """
+    if undated:
+        lo, hi = "UPD#", "UPD#~"
+    else:
+        lo = f"TS#{start_ms:013d}#"
+        hi = f"TS#{end_ms:013d}#~" if end_ms is not None else "TS#~"
+    streams = [
+        _query_partition(
+            client, table_name, pk, lo, hi, newest_first=newest_first, page_size=limit
+        )
+        for pk in shard_pks(base_pk, shards)
+    ]
+    merged = heapq.merge(*streams, key=lambda item: item["sk"]["S"], reverse=newest_first)
+    return list(itertools.islice(merged, limit))
@@ -91,13 +91,15 @@ class BotStack(Stack):
 
         # 5) Grant Lambda permission to invoke your chosen Bedrock model
         model_arn = f"arn:aws:bedrock:{self.region}::foundation-model/{'anthropic.claude-3-5-sonnet-20240620-v1:0'}"
+        # Query embeddings for the knowledge index (must match scripts/build_knowledge_index.py)
+        embed_model_arn = f"arn:aws:bedrock:{self.region}::foundation-model/amazon.titan-embed-text-v2:0"
         webhook.function.add_to_role_policy(
             iam.PolicyStatement(
                 actions=[
                     "bedrock:InvokeModel",
                     "bedrock:InvokeModelWithResponseStream",
                 ],
-                resources=[model_arn],
+                resources=[model_arn, embed_model_arn],
             )
         )
         # Handy attribute for app.py to export
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Offline build of the /ai_coach knowledge index.
+
+Chunks the curated corpus (knowledge/corpus/*.md|*.txt), embeds each chunk with
+Titan text embeddings on Bedrock and writes, next to the Lambda handler:
+  - index.npy   float16 matrix (n_chunks x dims), rows L2-normalised
+  - meta.json   model id, dims and per-chunk source/title/text (row order)
+
+Run it with AWS credentials that can invoke the embedding model, then
+`cdk deploy` ships the files with the function bundle:
+
+    python scripts/build_knowledge_index.py --region eu-central-1
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+import boto3
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVICE_DIR = ROOT / "kinethos_cdk" / "services" / "telegram_bot"
+# Reuse the Lambda's embedding request so index and query vectors always match
+sys.path.insert(0, str(SERVICE_DIR))
+from retrieval import INDEX_FILE, META_FILE, embed_text  # noqa: E402
+
+DEFAULT_CORPUS = ROOT / "knowledge" / "corpus"
+DEFAULT_OUT = SERVICE_DIR / "knowledge"
+DEFAULT_MODEL = "amazon.titan-embed-text-v2:0"
+
+_SOURCE_LINE = re.compile(r"^source:\s*(.+)$", re.IGNORECASE)
+
+
+def read_document(path: Path, corpus_dir: Path) -> tuple[str, str, list[str]]:
+    """Return (title, source, paragraphs). Title = first '# ' heading, source = 'Source:' line."""
+    title, source = path.stem.replace("_", " "), str(path.relative_to(corpus_dir))
+    paragraphs, current = [], []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        stripped = line.strip()
+        if stripped.startswith("# ") and not paragraphs and not current:
+            title = stripped[2:].strip()
+            continue
+        m = _SOURCE_LINE.match(stripped)
+        if m:
+            source = m.group(1).strip()
+            continue
+        if stripped:
+            current.append(stripped)
+        elif current:
+            paragraphs.append(" ".join(current))
+            current = []
+    if current:
+        paragraphs.append(" ".join(current))
+    return title, source, paragraphs
+
+
+def chunk_paragraphs(paragraphs: list[str], max_words: int, overlap: int) -> list[str]:
+    """Pack paragraphs into chunks of <= max_words; long paragraphs are split with overlap."""
+    pieces = []
+    for para in paragraphs:
+        words = para.split()
+        step = max(max_words - overlap, 1)
+        for i in range(0, max(len(words) - overlap, 1), step):
+            pieces.append(words[i:i + max_words])
+
+    chunks, current = [], []
+    for words in pieces:
+        if current and len(current) + len(words) > max_words:
+            chunks.append(" ".join(current))
+            current = []
+        current += words
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--dims", type=int, default=512, choices=[256, 512, 1024])
+    parser.add_argument("--max-words", type=int, default=180)
+    parser.add_argument("--overlap", type=int, default=30)
+    parser.add_argument("--region", default=os.getenv("BEDROCK_REGION", "eu-central-1"))
+    args = parser.parse_args(argv)
+
+    files = sorted(p for p in args.corpus.rglob("*") if p.suffix in (".md", ".txt") and p.name != "README.md")
+    if not files:
+        print(f"No corpus documents under {args.corpus}", file=sys.stderr)
+        return 1
+
+    chunks = []
+    for path in files:
+        title, source, paragraphs = read_document(path, args.corpus)
+        for text in chunk_paragraphs(paragraphs, args.max_words, args.overlap):
+            chunks.append({"source": source, "title": title, "text": text})
+    print(f"{len(files)} documents -> {len(chunks)} chunks")
+
+    brt = boto3.client("bedrock-runtime", region_name=args.region)
+    matrix = np.zeros((len(chunks), args.dims), dtype=np.float32)
+    for i, chunk in enumerate(chunks):
+        matrix[i] = embed_text(brt, args.model, chunk["text"], args.dims)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    np.save(args.out / INDEX_FILE, matrix.astype(np.float16))
+    with open(args.out / META_FILE, "w", encoding="utf-8") as f:
+        json.dump(
+            {"model": args.model, "dims": args.dims, "chunks": chunks},
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    size_kb = (args.out / INDEX_FILE).stat().st_size / 1024
+    print(f"Wrote {args.out}/{INDEX_FILE} ({size_kb:.0f} KB) and {META_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The Lambda modules import each other as top-level modules (as in /var/task)
+SERVICE_DIR = Path(__file__).resolve().parents[1] / "kinethos_cdk" / "services" / "telegram_bot"
+sys.path.insert(0, str(SERVICE_DIR))
@@ -0,0 +1,92 @@
+"""
+Budget checks for the Telegram webhook Lambda bundle.
+
+Budgets live in cdk.json (context.bundleBudget) and can be overridden with
+BUNDLE_MAX_MB / KNOWLEDGE_MAX_MB / IMPORT_MAX_MS. The bundle is taken from KINETHOS_BUNDLE_DIR or
+the assets referenced by the last `cdk synth` (cdk.out/*.assets.json).
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVICE_DIR = ROOT / "kinethos_cdk" / "services" / "telegram_bot"
+
+
+def _budget(key: str, env_var: str) -> float:
+    if os.getenv(env_var):
+        return float(os.environ[env_var])
+    cfg = json.loads((ROOT / "cdk.json").read_text())
+    return float(cfg["context"]["bundleBudget"][key])
+
+
+def _bundle_dirs() -> list[Path]:
+    """
+    Function asset (has lambda_function.py) + dependencies layer asset, if split.
+    Only assets referenced by the last synth's *.assets.json count; stale
+    asset.* directories left in cdk.out by earlier synths are ignored.
+    """
+    if os.getenv("KINETHOS_BUNDLE_DIR"):
+        return [Path(p) for p in os.environ["KINETHOS_BUNDLE_DIR"].split(os.pathsep)]
+    out = ROOT / "cdk.out"
+    referenced = []
+    for manifest in sorted(out.glob("*.assets.json")):
+        for entry in json.loads(manifest.read_text()).get("files", {}).values():
+            source = entry.get("source", {})
+            if source.get("packaging") == "zip":
+                referenced.append(out / source["path"])
+    fn = [p for p in referenced if (p / "lambda_function.py").is_file()]
+    layer = [p / "python" for p in referenced if (p / "python" / "telegram").is_dir()]
+    return fn[:1] + layer[:1]
+
+
+def _size_mb(path: Path) -> float:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / (1024 * 1024)
+
+
+def _import_ms(pythonpath: list[Path]) -> float:
+    """Time `import lambda_function` in a fresh interpreter (i.e. a cold start)."""
+    code = (
+        "import time; t = time.perf_counter(); import lambda_function; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(str(p) for p in pythonpath),
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "AWS_DEFAULT_REGION": os.getenv("AWS_DEFAULT_REGION", "eu-central-1"),
+        "TELEGRAM_TOKEN": "0:budget-test",
+    }
+    res = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    )
+    return float(res.stdout.strip().splitlines()[-1])
+
+
+def test_bundle_size_within_budget():
+    dirs = _bundle_dirs()
+    if not dirs:
+        pytest.skip("no bundle found; run `cdk synth` or set KINETHOS_BUNDLE_DIR")
+    max_mb = _budget("maxBundleMb", "BUNDLE_MAX_MB")
+    if any((d / "knowledge" / "index.npy").is_file() for d in dirs):
+        # numpy + the index itself, only bundled when an index ships
+        max_mb += _budget("knowledgeMaxMb", "KNOWLEDGE_MAX_MB")
+    size = sum(_size_mb(d) for d in dirs)
+    assert size <= max_mb, f"bundle is {size:.1f} MB (budget {max_mb} MB): {dirs}"
+
+
+def test_import_time_within_budget():
+    dirs = _bundle_dirs()
+    if not dirs:
+        # Fall back to the sources against the locally installed deps
+        pytest.importorskip("telegram")
+        pytest.importorskip("boto3")
+        dirs = [SERVICE_DIR]
+    max_ms = _budget("maxImportMs", "IMPORT_MAX_MS")
+    # best of 3 to keep CI noise out of the measurement
+    elapsed = min(_import_ms(dirs) for _ in range(3))
+    assert elapsed <= max_ms, f"import lambda_function took {elapsed:.0f} ms (budget {max_ms} ms)"
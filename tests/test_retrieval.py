@@ -0,0 +1,120 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from retrieval import INDEX_FILE, META_FILE, KnowledgeIndex, Passage, embed_text, format_sources  # noqa: E402
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "scripts"
+
+
+def _write_index(directory: Path, rows, chunks, dims=None):
+    np.save(directory / INDEX_FILE, np.asarray(rows, dtype=np.float16))
+    meta = {"model": "amazon.titan-embed-text-v2:0", "dims": dims or len(rows[0]), "chunks": chunks}
+    (directory / META_FILE).write_text(json.dumps(meta))
+
+
+@pytest.fixture
+def index(tmp_path):
+    rows = [[1, 0, 0], [0.8, 0.6, 0], [0, 1, 0], [0, 0, 1]]
+    chunks = [{"source": f"s{i}", "title": f"T{i}", "text": f"text {i}"} for i in range(4)]
+    _write_index(tmp_path, rows, chunks)
+    return KnowledgeIndex(str(tmp_path))
+
+
+def test_index_is_memory_mapped(index):
+    assert isinstance(index.matrix, np.memmap)
+    assert index.matrix.dtype == np.float16
+
+
+def test_search_top_k_order(index):
+    hits = index.search([2.0, 0.0, 0.0], k=3, min_score=-1.0)
+    assert [p.title for p in hits] == ["T0", "T1", "T2"]
+    assert hits[0].score == pytest.approx(1.0, abs=1e-3)
+    assert hits[1].score == pytest.approx(0.8, abs=1e-3)
+
+
+def test_search_min_score_filters(index):
+    assert [p.title for p in index.search([1, 0, 0], k=4, min_score=0.5)] == ["T0", "T1"]
+    assert index.search([1, 0, 0], k=0) == []
+
+
+def test_search_leaves_query_untouched(index):
+    q = np.array([3.0, 4.0, 0.0], dtype=np.float32)
+    index.search(q, k=1)
+    assert q.tolist() == [3.0, 4.0, 0.0]
+
+
+def test_shape_mismatch_raises(tmp_path):
+    _write_index(tmp_path, [[1, 0], [0, 1]], [{"text": "only one"}])
+    with pytest.raises(ValueError, match="does not match metadata"):
+        KnowledgeIndex(str(tmp_path))
+
+
+def test_format_sources():
+    passages = [
+        Passage("https://example.org/a", "Zone 2", "...", 0.9),
+        Passage("b.md", "", "...", 0.5),
+    ]
+    assert format_sources(passages) == "Sources:\n[1] Zone 2 (https://example.org/a)\n[2] b.md"
+
+
+def test_embed_request_shape():
+    """Index build and query share this request; pin it so both stay Titan v2 compatible."""
+
+    class Bedrock:
+        def invoke_model(self, **kwargs):
+            self.kwargs = kwargs
+            return {"body": io.BytesIO(b'{"embedding": [0.1, 0.2]}')}
+
+    brt = Bedrock()
+    assert embed_text(brt, "amazon.titan-embed-text-v2:0", "easy run", 256) == [0.1, 0.2]
+    assert brt.kwargs["modelId"] == "amazon.titan-embed-text-v2:0"
+    assert brt.kwargs["contentType"] == brt.kwargs["accept"] == "application/json"
+    assert json.loads(brt.kwargs["body"]) == {"inputText": "easy run", "dimensions": 256, "normalize": True}
+
+
+@pytest.fixture
+def build_script():
+    pytest.importorskip("boto3")
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    try:
+        import build_knowledge_index
+    finally:
+        sys.path.remove(str(SCRIPTS_DIR))
+    return build_knowledge_index
+
+
+def test_chunker_splits_long_paragraph_with_overlap(build_script):
+    words = [f"w{i}" for i in range(400)]
+    chunks = [c.split() for c in build_script.chunk_paragraphs([" ".join(words)], 180, 30)]
+    assert all(len(c) <= 180 for c in chunks)
+    # consecutive chunks share exactly `overlap` words
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev[-30:] == nxt[:30]
+    # no words lost: de-overlapped chunks rebuild the paragraph
+    rebuilt = chunks[0] + [w for c in chunks[1:] for w in c[30:]]
+    assert rebuilt == words
+
+
+def test_chunker_packs_short_paragraphs(build_script):
+    chunks = build_script.chunk_paragraphs(["a b c", "d e", "f g h i"], 6, 2)
+    assert chunks == ["a b c d e", "f g h i"]
+
+
+def test_search_scores_across_blocks(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    rows = rng.standard_normal((10, 4)).astype(np.float32)
+    rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+    _write_index(tmp_path, rows, [{"title": f"T{i}", "text": str(i)} for i in range(10)])
+    index = KnowledgeIndex(str(tmp_path))
+    monkeypatch.setattr(KnowledgeIndex, "BLOCK_ROWS", 3)  # 10 rows -> 4 uneven blocks
+
+    hits = index.search(rows[7], k=10, min_score=-1.0)
+    expected = np.argsort(rows.astype(np.float16).astype(np.float32) @ rows[7])[::-1]
+    assert [p.title for p in hits] == [f"T{i}" for i in expected]
+    assert hits[0].title == "T7"
@@ -0,0 +1,96 @@
+"""
+Synth checks for TelegramWebhook with Docker bundling skipped
+(aws:cdk:bundling-stacks=[]), so they run without Docker or AWS access.
+"""
+from pathlib import Path
+
+import pytest
+
+cdk = pytest.importorskip("aws_cdk")
+from aws_cdk.assertions import Match, Template  # noqa: E402
+
+from kinethos_cdk.constructs.telegram_webhook import (  # noqa: E402
+    TelegramWebhook,
+    _SlimBundlingHooks,
+    _slim_commands,
+)
+
+CODE_PATH = str(Path(__file__).resolve().parents[1] / "kinethos_cdk" / "services" / "telegram_bot")
+
+
+def _synth(code_path: str = CODE_PATH, **kwargs) -> Template:
+    app = cdk.App(context={"aws:cdk:bundling-stacks": []})
+    stack = cdk.Stack(app, "TestStack")
+    TelegramWebhook(stack, "Webhook", lambda_code_path=code_path, **kwargs)
+    return Template.from_stack(stack)
+
+
+def test_single_bundle_by_default():
+    template = _synth()
+    template.resource_count_is("AWS::Lambda::LayerVersion", 0)
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {
+            "Handler": "lambda_function.lambda_handler",
+            "Runtime": "python3.11",
+            "Layers": Match.absent(),
+        },
+    )
+    template.resource_count_is("AWS::ApiGatewayV2::Route", 1)
+
+
+def test_dependencies_layer_split():
+    template = _synth(dependencies_layer=True)
+    template.resource_count_is("AWS::Lambda::LayerVersion", 1)
+    template.has_resource_properties(
+        "AWS::Lambda::LayerVersion", {"CompatibleRuntimes": ["python3.11"]}
+    )
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {
+            "Handler": "lambda_function.lambda_handler",
+            "Layers": [{"Ref": Match.string_like_regexp("DependenciesLayer")}],
+        },
+    )
+
+
+def test_slim_hooks_commands():
+    hooks = _SlimBundlingHooks(
+        runtime_root="/var/task", exclude_runtime_packages=True, strip=True, precompile=True
+    )
+    assert hooks.before_bundling("/asset-input", "/asset-output") == []
+    cmds = hooks.after_bundling("/asset-input", "/asset-output")
+    assert "rm -rf /asset-output/boto3 /asset-output/boto3-*.dist-info" in cmds
+    assert any("-name tests" in c and "-name __pycache__" in c for c in cmds)
+    # compileall must come last, after stale pycs are removed
+    assert cmds[-1].startswith("python -m compileall")
+    assert "--invalidation-mode unchecked-hash" in cmds[-1]
+    assert "-p /var/task" in cmds[-1]
+
+
+def test_slim_commands_respect_flags():
+    assert _slim_commands(
+        "/out", runtime_root="/opt/python", exclude_runtime_packages=False, strip=False, precompile=False
+    ) == []
+
+
+def test_numpy_only_installed_with_knowledge_index(tmp_path):
+    hooks = _SlimBundlingHooks(
+        runtime_root="/var/task",
+        exclude_runtime_packages=True,
+        strip=True,
+        precompile=True,
+        extra_requirements="requirements-knowledge.txt",
+    )
+    cmds = hooks.after_bundling("/asset-input", "/asset-output")
+    # installed before slimming so numpy is stripped and precompiled too
+    assert cmds[0] == "python -m pip install -r /asset-input/requirements-knowledge.txt -t /asset-output"
+
+    app = cdk.App(context={"aws:cdk:bundling-stacks": []})
+    stack = cdk.Stack(app, "TestStack")
+    assert not TelegramWebhook(stack, "Plain", lambda_code_path=CODE_PATH).knowledge_enabled
+    (tmp_path / "lambda_function.py").write_text("def lambda_handler(event, context):\n    pass\n")
+    (tmp_path / "requirements.txt").write_text("")
+    (tmp_path / "knowledge").mkdir()
+    (tmp_path / "knowledge" / "index.npy").write_bytes(b"")
+    assert TelegramWebhook(stack, "Grounded", lambda_code_path=str(tmp_path)).knowledge_enabled
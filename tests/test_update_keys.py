@@ -0,0 +1,154 @@
+import pytest
+
+from update_keys import (
+    extract_header,
+    partition_key,
+    query_updates,
+    shard_pks,
+    sort_key,
+)
+
+
+@pytest.mark.parametrize(
+    "update, pk, epoch_ms",
+    [
+        ({"update_id": 1, "message": {"chat": {"id": 5}, "date": 10}}, "CHAT#5", 10_000),
+        ({"update_id": 2, "edited_channel_post": {"chat": {"id": -100}, "date": 11}}, "CHAT#-100", 11_000),
+        ({"update_id": 3, "my_chat_member": {"chat": {"id": -9}, "from": {"id": 4}, "date": 12}}, "CHAT#-9", 12_000),
+        ({"update_id": 4, "chat_boost": {"chat": {"id": 1}, "boost": {"add_date": 13}}}, "CHAT#1", 13_000),
+        ({"update_id": 5, "removed_chat_boost": {"chat": {"id": 1}, "remove_date": 14}}, "CHAT#1", 14_000),
+        ({"update_id": 6, "deleted_business_messages": {"chat": {"id": 8}, "message_ids": [1]}}, "CHAT#8", None),
+        ({"update_id": 7, "callback_query": {"from": {"id": 3}, "message": {"chat": {"id": 6}, "date": 15}}}, "CHAT#6", 15_000),
+        # inaccessible message: date 0 means "unknown", not 1970
+        ({"update_id": 8, "callback_query": {"from": {"id": 3}, "message": {"chat": {"id": 6}, "date": 0}}}, "CHAT#6", None),
+        ({"update_id": 9, "callback_query": {"from": {"id": 3}, "inline_message_id": "x"}}, "USER#3", None),
+        ({"update_id": 10, "inline_query": {"from": {"id": 7}, "query": "q"}}, "USER#7", None),
+        ({"update_id": 11, "poll_answer": {"user": {"id": 2}, "poll_id": "p"}}, "USER#2", None),
+        ({"update_id": 12, "poll_answer": {"voter_chat": {"id": -5}, "poll_id": "p"}}, "CHAT#-5", None),
+        ({"update_id": 13, "business_connection": {"user": {"id": 9}, "date": 16}}, "USER#9", 16_000),
+        ({"update_id": 19, "poll": {"id": "p"}}, "TYPE#poll#3", None),
+        ({"update_id": 20, "something_new": {"id": "x"}}, "TYPE#something_new#4", None),
+    ],
+)
+def test_header_and_partition(update, pk, epoch_ms):
+    header = extract_header(update)
+    assert header.update_id == update["update_id"]
+    assert header.update_type == next(k for k in update if k != "update_id")
+    assert header.epoch_ms == epoch_ms
+    assert partition_key(header, shards=8) == pk
+
+
+def test_undated_keys_are_stable_across_retries():
+    update = {"update_id": 42, "inline_query": {"from": {"id": 7}}}
+    first, retry = extract_header(update), extract_header(dict(update))
+    assert sort_key(first) == sort_key(retry) == "UPD#000000000042"
+    assert partition_key(first) == partition_key(retry)
+
+
+def test_sort_keys_unique_and_ordered():
+    headers = [
+        extract_header({"update_id": uid, "message": {"chat": {"id": 1}, "date": date}})
+        for uid, date in [(100, 5), (101, 5), (102, 5), (103, 6), (99, 1_700_000_000)]
+    ]
+    keys = [sort_key(h) for h in headers]
+    assert len(set(keys)) == len(keys)
+    assert keys[0] == "TS#0000000005000#000000000100"
+    # lexical order == (date, update_id) order thanks to zero padding
+    assert sorted(keys) == keys
+
+
+def test_shard_pks():
+    assert shard_pks("CHAT#1") == ["CHAT#1"]
+    assert shard_pks("TYPE#poll", shards=3) == ["TYPE#poll#0", "TYPE#poll#1", "TYPE#poll#2"]
+
+
+class PagingClient:
+    """Stub DynamoDB client: serves items per pk in sk order, `page` items per call."""
+
+    def __init__(self, items_by_pk: dict, page: int = 2) -> None:
+        self.items_by_pk = items_by_pk
+        self.page = page
+        self.calls = []
+
+    def query(self, **kwargs):
+        self.calls.append(kwargs)
+        values = kwargs["ExpressionAttributeValues"]
+        lo, hi = values[":lo"]["S"], values[":hi"]["S"]
+        items = sorted(
+            (i for i in self.items_by_pk.get(values[":pk"]["S"], []) if lo <= i["sk"]["S"] <= hi),
+            key=lambda i: i["sk"]["S"],
+            reverse=not kwargs["ScanIndexForward"],
+        )
+        start = kwargs.get("ExclusiveStartKey", 0)
+        size = min(self.page, kwargs.get("Limit", self.page))
+        resp = {"Items": items[start:start + size]}
+        if start + size < len(items):
+            resp["LastEvaluatedKey"] = start + size
+        return resp
+
+
+def _item(ms: int, uid: int) -> dict:
+    return {"sk": {"S": f"TS#{ms:013d}#{uid:012d}"}}
+
+
+@pytest.fixture
+def client():
+    items = {f"TYPE#poll#{n}": [_item(t, t) for t in range(n, 24, 3)] for n in range(3)}
+    items["TYPE#poll#0"].append({"sk": {"S": "UPD#000000000500"}})
+    return PagingClient(items)
+
+
+def _times(items):
+    return [int(i["sk"]["S"][3:16]) for i in items]
+
+
+def test_query_fans_out_and_merges_ascending(client):
+    items = query_updates(client, "tbl", "TYPE#poll", shards=3)
+    assert _times(items) == list(range(24))
+    assert {c["ExpressionAttributeValues"][":pk"]["S"] for c in client.calls} == {
+        "TYPE#poll#0", "TYPE#poll#1", "TYPE#poll#2",
+    }
+    # 8 items per shard at 2 per page -> paging followed LastEvaluatedKey
+    assert any("ExclusiveStartKey" in c for c in client.calls)
+
+
+def test_query_newest_first_with_limit(client):
+    items = query_updates(client, "tbl", "TYPE#poll", shards=3, newest_first=True, limit=5)
+    assert _times(items) == [23, 22, 21, 20, 19]
+    assert all(c["ScanIndexForward"] is False for c in client.calls)
+
+
+def test_query_time_range_and_limit(client):
+    items = query_updates(client, "tbl", "TYPE#poll", shards=3, start_ms=5, end_ms=12, limit=4)
+    assert _times(items) == [5, 6, 7, 8]
+
+
+def test_query_undated(client):
+    items = query_updates(client, "tbl", "TYPE#poll", shards=3, undated=True)
+    assert [i["sk"]["S"] for i in items] == ["UPD#000000000500"]
+
+
+@pytest.mark.parametrize(
+    "update",
+    [
+        {"update_id": 1, "message": {"chat": 5}},
+        {"update_id": 1, "callback_query": {"message": "x"}},
+        {"update_id": 1, "callback_query": {"message": {"chat": [1]}, "from": "me"}},
+        {"update_id": 1, "inline_query": {"from": ["id", 7]}},
+        {"update_id": 1, "chat_boost": {"chat": {"id": 1}, "boost": "soon"}},
+        {"update_id": "1", "poll": {"id": "p"}},
+        {"update_id": 1, "message": {"chat": {"id": 5}, "date": "yesterday"}},
+        {"update_id": 1, "message": None},
+    ],
+)
+def test_malformed_updates_never_raise(update):
+    header = extract_header(update)
+    assert partition_key(header).split("#")[0] in ("CHAT", "USER", "TYPE")
+    assert sort_key(header).startswith(("TS#", "UPD#"))
+
+
+def test_known_update_field_wins_over_unknown_objects():
+    update = {"update_id": 3, "future_field": {"id": 1}, "message": {"chat": {"id": 5}, "date": 1}}
+    header = extract_header(update)
+    assert header.update_type == "message"
+    assert partition_key(header) == "CHAT#5"